@@ -4,11 +4,19 @@ import os
 from datetime import datetime
 import logging
 import logging.handlers
-import traceback
-import math
-from functools import reduce
+from functools import lru_cache, wraps
 import threading
 import pathlib
+from collections import deque
+from itertools import islice, count
+from contextlib import contextmanager
+import sys
+import time
+import signal
+import queue
+import atexit
+import socket
+import warnings
 
 """uiblack.py: Streamlined cross-platform Textual UI"""
 
@@ -33,6 +41,83 @@ __license__ = "Apache 2.0"
 #  For a human-readable & fast explanation of the Apache 2.0 license visit:  http://www.tldrlegal.com/l/apache2
 
 
+# Syslog severities (0 - 7) and the closest logging level to each
+_SYSLOG_LEVELS = {
+    7: logging.DEBUG,
+    6: logging.INFO,
+    5: logging.INFO,
+    4: logging.WARNING,
+    3: logging.ERROR,
+    2: logging.CRITICAL,
+    1: logging.CRITICAL,
+    0: logging.CRITICAL,
+}
+
+# Keys moving the highlight through an ask_list() menu, and by how many items
+_MENU_STEPS = {"KEY_UP": -1, "KEY_DOWN": 1}
+
+# Keys choosing an answer to an ask_yn() question, and the answer each one picks
+_CONFIRM_CHOICES = {"KEY_LEFT": True, "y": True, "KEY_RIGHT": False, "n": False}
+
+# Console written to when a call does not name one
+_DEFAULT_CONSOLE = "a"
+
+# Joins the lines of a multi-line message into one
+_NEWLINE_TRANSLATION = str.maketrans({"\n": " >> "})
+
+
+def _sanitize_name(name):
+    """
+    Keeps only the word characters of a name (alphanumerics and underscores), so it is safe to use as a file name
+    :param name: Name to be sanitized
+    :type name: str
+    :return: (str) The sanitized name
+    """
+    return "".join(char for char in name if char.isalnum() or char == "_")
+
+
+def _fast_trace(exc):
+    """
+    Describes where an exception was raised from its innermost frame alone
+    Unlike the traceback module, no source lines are read, so there is no file access per exception
+    :param exc: The exception caught
+    :type exc: BaseException
+    :return: (str) The exception type, the file, line and function it was raised in, and its message
+    """
+    last = exc.__traceback__
+    if last is None:
+        # Never raised, so there is no frame to report
+        return f"{type(exc).__name__}: {exc}"
+    while last.tb_next is not None:
+        last = last.tb_next
+    code = last.tb_frame.f_code
+    return f"{type(exc).__name__} at {code.co_filename}:{last.tb_lineno} in {code.co_name}: {exc}"
+
+
+# Log name used when the one given is unusable, it never changes so it is only sanitized once
+_FALLBACK_NAME = _sanitize_name(__name__).lower()
+
+
+@lru_cache(maxsize=16)
+def _resolve_syslog_address(host, port, socktype=socket.SOCK_DGRAM):
+    """
+    Resolves a syslog server address once, so sending each record does not look the hostname up again
+    :param host: Hostname or IP of Syslog server
+    :type host: str
+    :param port: Port of Syslog server
+    :type port: int
+    :param socktype: Socket type the records are sent over
+    :type socktype: int
+    :return: (tuple) The (address, port) to send records to, unchanged if the name could not be resolved
+    """
+    try:
+        address_info = socket.getaddrinfo(host, port, 0, socktype)
+    except OSError:
+        # Leave resolution to the handler, which reports failures through logging itself
+        return host, port
+    return address_info[0][4][:2]
+
+
 class UIBlackTerminal:
     def __init__(self, log_name, **kwargs):
         """
@@ -43,11 +128,23 @@ class UIBlackTerminal:
         :keyword log_level: (int) 0 - 7 - Conforms to https://en.wikipedia.org/wiki/Syslog#Severity_level
         :keyword sysloghost: (str) Hostname or IP of Syslog server (Can also be localhost)
         :keyword syslogport: (int) Port of Syslog server, (514 is standard on many systems)
+        :keyword syslog_socktype: (int) socket.SOCK_DGRAM (UDP, the default) or socket.SOCK_STREAM (TCP)
+            Records are sent to syslog in batches of 256, anything ERROR or above is sent at once along with the batch
         :keyword simple: (bool) Use the simplest textual output while preserving logging and other features
         """
-        self._lock = threading.Lock()
+        # Guards the console state while it is redrawn, never held while waiting on the user
+        self._render_lock = threading.Lock()
+        # Serializes the interactive prompts, so only one of them waits for keys at a time
+        self._input_lock = threading.Lock()
+        # Rows an interactive prompt is drawn on, console redraws leave them alone until it is answered
+        self._reserved_rows = frozenset()
+        # Serializes frame writes, so output from concurrent threads never interleaves mid-frame
+        # It also guards the record of what is on screen (_last_rendered and the console signature), which every
+        # draw changes along with its write. Re-entrant, since a console redraw holds it around its own _draw()
+        self._draw_lock = threading.RLock()
         sysloghost = kwargs.get("sysloghost", None)
         syslogport = kwargs.get("syslogport", None)
+        syslog_socktype = kwargs.get("syslog_socktype", socket.SOCK_DGRAM)
         restart_log = kwargs.get("restart_log", True)
         log_level = kwargs.get("log_level", 6)
         simple = kwargs.get("simple", False)
@@ -69,67 +166,173 @@ class UIBlackTerminal:
             filemode = "a"
         if isinstance(log_name, str):
             # Keep only alphanumerics
-            self._program_name = re.sub("\W", "", log_name)
+            self._program_name = _sanitize_name(log_name)
             # Truncate name to 50 chars
             self._program_name = self._program_name[0:50]
             self._program_name = self._program_name.lower()
             if len(self._program_name) < 3:
                 # Keep only alphanumerics in case __name__ has wierdness
-                self._program_name = re.sub("\W", "", __name__).lower()
+                self._program_name = _FALLBACK_NAME
         else:
-            self._program_name = re.sub("\W", "", __name__).lower()
+            self._program_name = _FALLBACK_NAME
         full_path = pathlib.Path.cwd() / "logs"
         full_path.mkdir(parents=True, exist_ok=True)
         full_path = full_path / f"{self._program_name}.log"
         self._logger = logging.getLogger(self._program_name)
+        for handler in list(self._logger.handlers):
+            owner = getattr(handler, "_uiblack_terminal", None)
+            if owner is not None:
+                # An earlier terminal with the same log name still writes to the same file, it lets go of it first
+                owner._release_logging()
         format_string_local = f"{self._program_name}: %(levelname)s - %(asctime)s - %(message)s"
         format_string_syslog = f"{self._program_name}: %(levelname)s - %(message)s"
-        logging.basicConfig(
-            filename=full_path,
-            filemode=filemode,
-            format=format_string_local,
-            datefmt="%y-%b-%d %H:%M:%S (%z)",
-        )
+        file_handler = logging.FileHandler(full_path, mode=filemode)
+        file_handler.setFormatter(logging.Formatter(format_string_local, datefmt="%y-%b-%d %H:%M:%S (%z)"))
+        # Records reach the file in batches, anything ERROR or above is written out immediately along with the batch
+        log_sinks = [logging.handlers.MemoryHandler(capacity=256, flushLevel=logging.ERROR, target=file_handler)]
+        syslog_error = None
         if isinstance(sysloghost, str) and isinstance(syslogport, int):
-            self.handler = logging.handlers.SysLogHandler(address=(sysloghost, syslogport))
-            self.handler.formatter = logging.Formatter(format_string_syslog)
-            self._logger.addHandler(self.handler)
+            try:
+                self.handler = logging.handlers.SysLogHandler(
+                    address=_resolve_syslog_address(sysloghost, syslogport, syslog_socktype), socktype=syslog_socktype
+                )
+            except OSError as e:
+                # A stream socket connects right away, an unreachable server must not keep the terminal from starting
+                syslog_error = e
+            else:
+                self.handler.formatter = logging.Formatter(format_string_syslog)
+                # Syslog is batched the same way as the file, rather than one send per record
+                log_sinks.append(
+                    logging.handlers.MemoryHandler(capacity=256, flushLevel=logging.ERROR, target=self.handler)
+                )
+        # Logging calls only enqueue the record, the disk and syslog writes happen on a background thread
+        self._log_queue = queue.SimpleQueue()
+        self._log_queue_handler = logging.handlers.QueueHandler(self._log_queue)
+        self._log_sinks = tuple(log_sinks)
+        for handler in (self._log_queue_handler, *self._log_sinks):
+            # Handlers are tagged with their terminal, so a later one only ever removes what uiblack installed
+            handler._uiblack_terminal = self
+        self._logger.addHandler(self._log_queue_handler)
+        # The records are fully handled here, walking up to the root logger would only cost time
+        self._logger.propagate = False
+        self._log_listener = logging.handlers.QueueListener(self._log_queue, *log_sinks, respect_handler_level=True)
+        self._log_listener.start()
+        atexit.register(self._shutdown_logging)
         self.console_a_percentage = 0.75
         self.console_b_percentage = 1 - self.console_a_percentage
         self.set_log_level(log_level)
+        if syslog_error is not None:
+            self._logger.error(
+                f"Syslog server {sysloghost}:{syslogport} unreachable, logging to file only: {syslog_error}"
+            )
 
         self._title = None
-        self._pattern_text = re.compile("([ -~])")
+        self._cursor_row = 0
+        self._pattern_sgr = re.compile(r"\x1b\[([0-9;]*)m")
 
-        self._low_latency_index = 0
+        # load_bar() calls made with low_latency enabled draw at most once per interval (in seconds)
+        self.low_latency_interval = 1 / 30
+        # No longer consulted, low_latency_interval replaced this call count, kept so that code setting it keeps working
         self.low_latency_max = 1000
+        self._last_low_latency_update = 0.0
+        # The latest load bar skipped for being too soon waits here, a timer draws it once the interval is over
+        self._load_bar_lock = threading.Lock()
+        self._deferred_load_bar = None
+        self._pending_load_bar = None
+        # Console redraws are capped to this many per second, redraws arriving sooner are coalesced into one
+        self.max_fps = 60
+        self._last_console_refresh = 0.0
+        self._pending_refresh = None
+        # Every append takes a new number from the counter, the consoles only need redrawing when it moved on
+        # Any other draw may cover console rows, so it forgets the signature of the last console redraw
+        self._console_counter = count()
+        self._console_generation = next(self._console_counter)
+        self._console_signature = None
+        # The load bar is skipped while nothing it shows changed, for as long as nothing else was drawn either
+        self._load_bar_key = None
 
         self._term = Terminal()
+        self._out = sys.stdout
+        # Absolute cursor movements never change, so any previously expanded one can be reused
+        self._move_yx = lru_cache(maxsize=512)(self._term.move_yx)
+        # Console entries never change once appended, so each is only fitted once per console width
+        self._fit_row = lru_cache(maxsize=1024)(self._fit_row)
+        # Styling support is fixed for the life of the terminal, so it is only looked up once
+        self._does_styling = self._term.does_styling
         self._term.enter_fullscreen()
         self._term.hidden_cursor()
 
-        self._default_bg = f"{self._term.on_black}"
-        self._window_bg = f"{self._term.reverse}"
-        self._error_bg = f"{self._term.on_white}"
-        self._warn_bg = f"{self._term.on_black}"
-
-        self._default_style = f"{self._term.normal}{self._term.white}{self._default_bg}"
-        self._window_style = f"{self._term.normal}{self._term.white}{self._window_bg}"
-        self._error_style = f"{self._term.normal}{self._term.red}{self._error_bg}"
-        self._warn_style = f"{self._term.normal}{self._term.yellow}{self._warn_bg}"
-        self._default_style = f"{self._term.normal}{self._term.snow3}{self._default_bg}"
-
+        self._default_bg = str(self._term.on_black)
+        self._window_bg = str(self._term.reverse)
+        self._error_bg = str(self._term.on_white)
+        self._warn_bg = str(self._term.on_black)
+
+        # Each style is collapsed into one SGR sequence, since they are re-emitted with nearly every write
+        # They are interned as well, so that comparing styles against one another is an identity check
+        self._window_style = sys.intern(self._combine_sgr(self._term.normal, self._term.white, self._window_bg))
+        self._error_style = sys.intern(self._combine_sgr(self._term.normal, self._term.red, self._error_bg))
+        self._warn_style = sys.intern(self._combine_sgr(self._term.normal, self._term.yellow, self._warn_bg))
+        self._default_style = sys.intern(self._combine_sgr(self._term.normal, self._term.snow3, self._default_bg))
+        # Capabilities used by the styling helpers and menus, resolved once instead of on every access
+        self._bold = str(self._term.bold)
+        self._underline = str(self._term.underline)
+        self._no_underline = str(self._term.no_underline)
+        self._reverse = str(self._term.reverse)
+        self._default = str(self._term.default)
+        self._clear_eos = str(self._term.clear_eos)
+        self._clear_eol = str(self._term.clear_eol)
+        self._clear = str(self._term.clear)
+        # The styled timestamp only varies in the time itself, so the brackets around it are built once
+        self._time_open = f"{self._term.olivedrab}[{self._term.turquoise}"
+        self._time_close = f"{self._term.olivedrab}]{self._default_style} "
+        # Frames are encoded straight into one reusable buffer, which is then written to the binary stream
+        self._framebuf = bytearray()
+        self._out_buffer = getattr(self._out, "buffer", None)
+        self._out_encoding = getattr(self._out, "encoding", None) or "utf-8"
+        self._out_errors = getattr(self._out, "errors", None) or "strict"
+        # Synchronized output (DEC private mode 2026), terminals hold off painting until the frame is complete
+        # Terminals without support ignore the unknown mode
+        self._sync_begin = "\x1b[?2026h"
+        self._sync_end = "\x1b[?2026l"
+        self._frame_begin_bytes = f"{self._sync_begin}{self._default_style}".encode(
+            self._out_encoding, self._out_errors
+        )
+        self._sync_end_bytes = self._sync_end.encode(self._out_encoding, self._out_errors)
+        # load_bar() percentages are whole numbers from 0 to 100, so every gradient color is built up front
+        self._gradient_table = [
+            str(self._term.color_rgb(2 * (100 - percent), 2 * percent, 0)) for percent in range(101)
+        ]
+        self._gradient_out_of_range = str(self._term.color_rgb(0, 0, 100))
+
+        # No longer consulted, kept so that code setting them keeps working
         self.update_counter_interval = 10
-        self._update_counter = 0
-        self.console_scrollback = 500
-        self._contents_console_a = [""]
-        self._contents_console_b = [""]
-        self._previous_height = self._term.height
-        self._previous_width = self._term.width
         self.last_updates_heuristic_enabled = True
-        self._max_last_updates = 5
-        self._last_updates = [datetime.now()]
         self.heuristic_target_seconds = 10
+        self.console_scrollback = 500
+        # Console entries are stored as (text, printable length), the length is measured once when appended
+        self._contents_console_a = deque([("", 0)], maxlen=self.console_scrollback)
+        self._contents_console_b = deque([("", 0)], maxlen=self.console_scrollback)
+        # Row number -> line most recently drawn there by the console panes
+        self._last_rendered = {}
+        # Set when plain print() output scrolled the screen, console rows stop short of the last column it moved up
+        self._scrolled = False
+        # Reading the dimensions from the terminal asks the kernel each time, so they are only read on a resize
+        self._cached_height = self._term.height
+        self._cached_width = self._term.width
+        self._recompute_cached_strings()
+        # Starts dirty so that the first update wipes whatever was on screen before
+        self._dirty_size = True
+        self._resize_signal = False
+        self._previous_resize_handler = None
+        if hasattr(signal, "SIGWINCH"):
+            try:
+                self._previous_resize_handler = signal.signal(signal.SIGWINCH, self._on_resize)
+                self._resize_signal = True
+            except ValueError:
+                # Signal handlers may only be installed from the main thread
+                pass
+        self._time_cache_key = None
+        self._time_cache_val = None
 
     def set_log_level(self, log_level):
         """
@@ -137,26 +340,21 @@ class UIBlackTerminal:
         :param log_level: 0 - 7 Conforms to https://en.wikipedia.org/wiki/Syslog#Severity_level
         :type log_level: int
         """
-        if log_level == 7:
-            self._logger.setLevel(logging.DEBUG)
-        elif log_level in [6, 5]:
-            self._logger.setLevel(logging.INFO)
-        elif log_level == 4:
-            self._logger.setLevel(logging.WARNING)
-        elif log_level == 3:
-            self._logger.setLevel(logging.ERROR)
-        elif log_level in [2, 1, 0]:
-            self._logger.setLevel(logging.CRITICAL)
-        else:
-            self._logger.setLevel(logging.NOTSET)
+        self._logger.setLevel(_SYSLOG_LEVELS.get(log_level, logging.NOTSET))
 
     def set_low_latency_refresh_interval(self, interval: int):
         """
         When using the low_latency argument for various functions,
         specify the number of display intervals before refreshing
+        Deprecated: redraws are capped by max_fps (per second) and low_latency_interval (in seconds) instead
         :param interval: Number of intervals before refreshing the display
         :type interval: int
         """
+        warnings.warn(
+            "set_low_latency_refresh_interval() no longer has any effect, set max_fps or low_latency_interval instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         if round(interval) < 0:
             interval = 100
         elif round(interval) > 9223372036854775807:
@@ -164,6 +362,41 @@ class UIBlackTerminal:
             interval = 9223372036854775807
         self.update_counter_interval = round(interval)
 
+    def set_console_scrollback(self, lines: int):
+        """
+        Sets how many entries each console keeps, the oldest entries beyond it are discarded
+        :param lines: Number of entries kept per console
+        :type lines: int
+        """
+        lines = max(round(lines), 2)
+        self.console_scrollback = lines
+        with self._render_lock:
+            # A deque's maxlen is fixed, so both are rebuilt from their newest entries
+            self._contents_console_a = deque(self._contents_console_a, maxlen=lines)
+            self._contents_console_b = deque(self._contents_console_b, maxlen=lines)
+
+    def _combine_sgr(self, *sequences):
+        """
+        Merges several SGR (Select Graphic Rendition) escape sequences into a single equivalent sequence
+        Example: ESC[m, ESC[37m and ESC[40m become ESC[0;37;40m
+        :param sequences: (str) Capability strings, as provided by blessed
+        :return: (str) The combined sequence, or the sequences unaltered if any of them are not plain SGR
+        """
+        params = []
+        for sequence in sequences:
+            sequence = str(sequence)
+            if sequence == "":
+                # Capability is not supported or output is not styled
+                continue
+            found = self._pattern_sgr.fullmatch(sequence)
+            if found is None:
+                return "".join(str(sequence) for sequence in sequences)
+            # An empty parameter list is equivalent to 0 (reset)
+            params.append(found.group(1) or "0")
+        if not params:
+            return ""
+        return f"\x1b[{';'.join(params)}m"
+
     def _center_pad_text(self, text, **kwargs):
         """
         Centers a string inside a designated length of pad characters (usually whitespace)
@@ -177,6 +410,8 @@ class UIBlackTerminal:
         if len(text) >= total_len:
             # Nothing to pad out, the text meets or exceeds the size allotted
             return text
+        if len(pad) == 1:
+            return text.center(total_len, pad)
         center = round(total_len / 2)
         text_center = round(len(text) / 2)
         differential = center - text_center
@@ -190,8 +425,8 @@ class UIBlackTerminal:
         elif console_letter.lower() == "b":
             percentage = self.console_b_percentage
 
-        width = self._term.width
-        height = round(self._term.height * percentage)
+        width = self._cached_width
+        height = round(self._cached_height * percentage)
 
         if console_letter.lower() == "a":
             if self._title is None:
@@ -199,7 +434,7 @@ class UIBlackTerminal:
             else:
                 ceiling = 1
         else:
-            ceiling = self._term.height - height
+            ceiling = self._cached_height - height
 
         return width, height, ceiling
 
@@ -208,37 +443,35 @@ class UIBlackTerminal:
         divider_height = ceiling - 1
         return width, divider_height
 
-    def _draw_divider(self):
-        if self._term.does_styling and self.rich_ui:
-            width, divider_height = self._horiz_divider_dimensions()
-            text = "═" * width
-            self.print(text, 0, divider_height, True)
-        else:
-            return
-        return
+    def _divider_cell(self):
+        """
+        :return: (tuple) The (text, right, down) cell of the divider between both consoles
+        """
+        _, divider_height = self._horiz_divider_dimensions()
+        return self._divider_row, 0, divider_height
 
     def _skip_iteration(self, is_low_latency_enabled):
-        # Low latency was set, have we hit max?
+        # Low latency was set, has enough time passed since the last update?
         if is_low_latency_enabled:
-            if self._low_latency_index >= self.low_latency_max:
-                # We hit the max, so run this iteration and reset index
-                self._low_latency_index = 0
-                return False
-            else:
-                self._low_latency_index += 1  # Have not hit max, so increment
-                return True  # and skip this execution
+            now = time.monotonic()
+            if (now - self._last_low_latency_update) < self.low_latency_interval:
+                return True  # Too soon, so skip this execution
+            self._last_low_latency_update = now
         return False
 
     def _len_printable(self, text):
-        return len(self._term.strip(text))
+        # blessed does not recognize SGR sequences carrying many parameters, such as the combined styles
+        return len(self._term.strip(self._pattern_sgr.sub("", text)))
 
-    def _refresh_console(self, console_letter):
+    def _refresh_console(self, console_letter, frame, rendered):
+        """
+        Adds the rows of one console which differ from what is on screen to a frame being assembled
+        :param console_letter: Which console to render, "a" or "b"
+        :type console_letter: str
+        :param frame: (list) Cells to be drawn, appended to in place
+        :param rendered: (dict) Receives each row number and the line which will be drawn on it
+        """
         fixed_width, fixed_height, ceiling = self._get_dimensions(console_letter)
-        self._draw_divider()
-        while len(self._contents_console_a) >= self.console_scrollback:
-            self._contents_console_a.pop(0)
-        while len(self._contents_console_b) >= self.console_scrollback:
-            self._contents_console_b.pop(0)
 
         if console_letter.lower() == "a":
             print_height = fixed_height - 2
@@ -247,98 +480,167 @@ class UIBlackTerminal:
             print_height = (ceiling + fixed_height) - 1
             contents = self._contents_console_b
 
-        for index in range(len(contents) - 1, 0, -1):
+        # Newest to oldest, leaving out the oldest entry just as before
+        for text, actual_len in islice(reversed(contents), len(contents) - 1):
             if print_height < ceiling:
                 break
-            actual_len = self._len_printable(contents[index])
-            pad = " " * (fixed_width - (actual_len + 1))
-            if actual_len > fixed_width:
-                offset = actual_len - (fixed_width - 5)
-                result = f"{contents[index][:-offset]}..."
-            else:
-                result = contents[index]
-            self.print(
-                f"{result}{pad}",
-                0,
-                print_height,
-                True,
-            )
+            if print_height in self._reserved_rows:
+                # A prompt is on screen there, the row is redrawn once the prompt is answered
+                print_height -= 1
+                continue
+            line = self._fit_row(text, actual_len, fixed_width)
+            previous = self._last_rendered.get(print_height)
+            if previous != line:
+                # Rows which are already on screen exactly as they would be drawn are skipped
+                frame.append(self._diff_row(previous, line, print_height))
+                rendered[print_height] = line
             print_height -= 1
 
-    def _refresh_consoles(self):
-        self._refresh_console("a")
-        self._refresh_console("b")
-
-    def _calculate_update_heuristic(self):
+    def _fit_row(self, text, actual_len, fixed_width):
+        """
+        Pads or truncates a console entry to the width of its console
+        :param text: The console entry
+        :type text: str
+        :param actual_len: Printable length of the entry
+        :type actual_len: int
+        :param fixed_width: Width of the console
+        :type fixed_width: int
+        :return: (str) The row to be drawn
+        """
+        if "\x1b" not in text:
+            # Without escape sequences every character is one column, so plain string methods do the job
+            if actual_len > fixed_width:
+                # A console narrower than the ellipsis keeps none of the text, a negative slice would keep most of it
+                return f"{text[:max(fixed_width - 5, 0)]}..."
+            return text.ljust(fixed_width - 1)
+        pad = " " * (fixed_width - (actual_len + 1))
+        if actual_len > fixed_width:
+            offset = actual_len - (fixed_width - 5)
+            return f"{text[:-offset]}...{pad}"
+        return f"{text}{pad}"
+
+    def _diff_row(self, previous, line, row):
+        """
+        Works out the smallest cell which turns the row previously drawn into the new one
+        Only plain rows of equal length are compared column by column, as escape sequences do not map onto columns
+        :param previous: The row as it was last drawn, or None if unknown
+        :type previous: str
+        :param line: The row to be drawn
+        :type line: str
+        :param row: Y coordinate on screen
+        :type row: int
+        :return: (tuple) The (text, right, down) cell to be drawn
+        """
+        if previous is None or len(previous) != len(line) or "\x1b" in previous or "\x1b" in line:
+            return line, 0, row
+        start = 0
+        end = len(line)
+        while previous[start] == line[start]:
+            start += 1
+        while previous[end - 1] == line[end - 1]:
+            end -= 1
+        # Only the run between the first and last changed columns is rewritten
+        return line[start:end], start, row
+
+    def _refresh_consoles(self, force=False):
         """
-        Calculates whether the console is being refreshed at the correct interval to prevent screen flickering
-        The default is one refresh every 10 seconds.
-        This entire process is governed by the variable self.heuristic_target_seconds
-        :return: None
+        Redraws both consoles, at most max_fps times per second unless forced
+        A redraw arriving too soon is deferred until the frame budget allows it
+        :param force: Redraw immediately regardless of the frame budget
+        :type force: bool
         """
-        if self.last_updates_heuristic_enabled:
-            self._last_updates.append(datetime.now())
-        if len(self._last_updates) < 5:
+        if not self._does_styling or not self.rich_ui:
             return
-
-        while True:
-            if len(self._last_updates) > self._max_last_updates:
-                self._last_updates.pop(0)
-            else:
-                break
-
-        target = self.heuristic_target_seconds
-        deltas = []
-        previous_datetime = 0
-        for current_datetime in self._last_updates:
-            if previous_datetime == 0:
-                # This is the first entry, so store and move on
-                previous_datetime = current_datetime
-                continue
-            delta = (current_datetime - previous_datetime).seconds
-            deltas.append(delta)
-            previous_datetime = current_datetime
-        del previous_datetime
-        # Super performant way to average a list, shaves tiny amounts of time from this function
-        average = reduce(lambda x, y: x + y, deltas) / len(deltas)
-        if average <= target:
-            # The refresh times are trending too low, so bump up the interval incrementally
-            ms_to_change = math.sqrt(target - average)
-            self.update_counter_interval += ms_to_change * 20
-        elif average > target:
-            # The refresh times are trending too high, so walk down the interval incrementally
-            ms_to_change = math.sqrt(average - target)
-            self.update_counter_interval += ms_to_change * 10
-        if self.update_counter_interval <= 0:
-            self.update_counter_interval = 1
+        # Comparing against what is on screen, drawing and recording it again happen without any draw in between
+        with self._draw_lock:
+            signature = (self._console_generation, self._cached_width, self._cached_height, self._title)
+            if signature == self._console_signature:
+                # Nothing was added and nothing else was drawn since the last redraw, so the screen is already current
+                return
+            now = time.monotonic()
+            wait = (self._last_console_refresh + 1 / self.max_fps) - now
+            if not force and wait > 0:
+                if self._pending_refresh is None:
+                    # Whatever else arrives before the timer fires is drawn along with it
+                    self._pending_refresh = threading.Timer(wait, self._deferred_refresh)
+                    self._pending_refresh.daemon = True
+                    self._pending_refresh.start()
+                return
+            self._last_console_refresh = now
+            # Both consoles and the divider between them go out as one frame
+            frame = [self._divider_cell()]
+            rendered = {}
+            self._refresh_console("a", frame, rendered)
+            self._refresh_console("b", frame, rendered)
+            if self._scrolled:
+                self._scrolled = False
+                # Console rows leave the last column alone, whatever scrolled into it is blanked out separately
+                frame.extend((" ", self._cached_width - 1, row) for row in rendered)
+            # Every other draw positions the cursor itself, so there is no point in saving and restoring it here
+            self._draw(frame)
+            self._last_rendered.update(rendered)
+            self._console_signature = signature
+
+    def _deferred_refresh(self):
+        with self._render_lock:
+            self._pending_refresh = None
+            self._refresh_consoles(force=True)
+
+    def _recompute_cached_strings(self):
+        """
+        Rebuilds the strings which only depend on the terminal dimensions, must be called whenever they change
+        """
+        self._blank_row = " " * self._cached_width
+        # The divider spans the whole width, see _horiz_divider_dimensions()
+        self._divider_row = "═" * self._cached_width
+        # Moves to the start of each row are the most common by far, so those come from a plain table
+        self._move_col0 = [str(self._term.move_yx(row, 0)) for row in range(self._cached_height + 1)]
+        self._blank_row_styled = f"{self._window_style}{self._blank_row}"
+        # load_bar() slices its fill out of this, the bar never grows wider than the terminal
+        self._bar_fill_row = "█" * self._cached_width
+
+    def _on_resize(self, signum, frame):
+        self._dirty_size = True
+        if callable(self._previous_resize_handler):
+            # Keep any handler the host program installed working
+            self._previous_resize_handler(signum, frame)
+
+    def _size_changed(self):
+        if self._resize_signal:
+            return self._dirty_size
+        # No SIGWINCH on this platform (or not installed from the main thread), so poll the dimensions instead
+        return self._dirty_size or self._term.height != self._cached_height or self._term.width != self._cached_width
 
     def _check_update(self):
-        self._lock.acquire()
-        self._update_counter += 1
-        previous_total = self._previous_height + self._previous_width
-        current_total = self._term.height + self._term.width
-        if self._update_counter >= self.update_counter_interval:
-            # This is only reset when triggered by the counter
-            self._update_counter = 0
-            self.clear()
-            self._display_main_title()
-            self._refresh_consoles()
-            # This is only run when the counter is triggered
-            self._calculate_update_heuristic()
-        elif current_total != previous_total:
-            self._previous_height = self._term.height
-            self._previous_width = self._term.width
-            self.clear()
-            self._display_main_title()
-            self._refresh_consoles()
-        self._lock.release()
+        with self._render_lock:
+            # Wiping the screen would take a prompt with it, so a resize waits until the prompt is answered
+            if not self._reserved_rows and self._size_changed():
+                # Only a resize warrants wiping the screen, everything is then reflowed to the new dimensions
+                self._dirty_size = False
+                self._cached_height = self._term.height
+                self._cached_width = self._term.width
+                self._recompute_cached_strings()
+                self.clear()
+                self._refresh_consoles(force=True)
+            else:
+                # The frame budget in there coalesces bursts, and defers the last redraw rather than dropping it
+                self._refresh_consoles()
 
     def _get_time_string(self):
-        now = datetime.now()
-        if self._term.does_styling and self.rich_ui:
-            return f"{self._term.olivedrab}[{self._term.turquoise}{now.strftime('%H:%M')}{self._term.olivedrab}]{self._default_style} "
+        timestamp = time.time()
+        styled = self._does_styling and self.rich_ui
+        # Only hours and minutes are displayed, so the string only needs rebuilding once per minute
+        key = (int(timestamp // 60), styled)
+        if key == self._time_cache_key:
+            return self._time_cache_val
+        now = datetime.fromtimestamp(timestamp)
+        if styled:
+            result = f"{self._time_open}{now.strftime('%H:%M')}{self._time_close}"
         else:
-            return f"[{now.strftime('%H:%M')}] "
+            result = f"[{now.strftime('%H:%M')}] "
+        self._time_cache_key = key
+        self._time_cache_val = result
+        return result
 
     def print(self, text, right=None, down=None, ignore_log=False):
         """
@@ -353,81 +655,271 @@ class UIBlackTerminal:
         :param ignore_log: Prevent logging of the text
         :type ignore_log: bool
         """
-        if not ignore_log:
+        if not ignore_log and self._logger.isEnabledFor(logging.INFO):
             self._logger.info(text)
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
-            actual_len = self._len_printable(text)
+        if self._does_styling and self.rich_ui:
             if (down is not None) and (right is not None):
-                if down > self._term.height:
-                    # Since all the text will not be displayable, skip
-                    return
-                if right > self._term.width:
-                    return
-                if right + actual_len > self._term.width:
-                    # Truncate the string to prevent wraparound
-                    # We take off the right side of the string to deal with formatting non-printables being on the left
-                    offset = self._term.width - right
-                    trim = actual_len - offset
-                    if trim < 1:
-                        return
-                    text = f"{text[:-trim]}"
-                if right < 0:
-                    return
-                if down < 0:
-                    return
                 with self._term.location():
-                    print(
-                        self._term.move(down, right) + f"{self._default_style}{text}{self._default_style}",
-                        end="",
-                    )
+                    self._draw(((text, right, down),))
             else:
-                print(f"{self._default_style}{text}")
+                self._print_stream(text)
         else:
-            print(text)
+            self._out.write(f"{text}\n")
+            self._cursor_row += 1
+
+    def _print_stream(self, text):
+        """
+        Writes text on the row below the previous plain print(), as printing to a scrolling terminal would
+        Frames leave the cursor wherever they drew last, so the row is tracked locally and moved to explicitly
+        :param text: Text to be written on screen
+        :type text: str
+        """
+        last_row = self._cached_height - 1
+        row = min(self._cursor_row, last_row)
+        width = max(self._cached_width, 1)
+        # Every line of the text takes up at least one row, longer ones wrap onto the rows below
+        rows = sum(max(1, -(-self._len_printable(line) // width)) for line in text.split("\n"))
+        scrolled = row + rows > last_row
+        # Whatever was drawn further along the covered rows is erased, no console redraws rows it does not own
+        erase = f"{self._default_style}{self._clear_eol}"
+        with self._draw_lock:
+            self._out.write(
+                f"{self._move(row, 0)}{self._default_style}{text.replace(chr(10), erase + chr(10))}{erase}\n"
+            )
+            # The consoles only redraw rows which differ from what they last drew, so they must learn of this write
+            self._console_signature = None
+            self._load_bar_key = None
+            if scrolled:
+                # The whole screen moved up, no row holds what was last drawn on it any more
+                self._last_rendered.clear()
+                self._scrolled = True
+            else:
+                for covered in range(row, row + rows):
+                    self._last_rendered.pop(covered, None)
+        # Past the bottom row the terminal scrolls, the next line goes on the bottom row again
+        self._cursor_row = min(row + rows, last_row)
+        if scrolled:
+            # The title scrolled off along with everything else
+            self._display_main_title()
+
+    def _move(self, down, right):
+        """
+        Looks up the cursor movement to a specified X,Y coordinate, every movement is only expanded once
+        :param down: Y coordinate on screen
+        :type down: int
+        :param right: X coordinate on screen
+        :type right: int
+        :return: (str) The escape sequence moving the cursor
+        """
+        if right == 0 and down < len(self._move_col0):
+            return self._move_col0[down]
+        return self._move_yx(down, right)
+
+    def _compose(self, text, right, down):
+        """
+        Builds the cursor movement and text needed to place text at a specified X,Y coordinate on screen
+        The default style is expected to be active already, _draw() emits it once at the start of each frame
+        :param text: Text to be written on screen
+        :type text: str
+        :param right: X coordinate on screen
+        :type right: int
+        :param down: Y coordinate on screen
+        :type down: int
+        :return: (str) The escape sequences and text, or an empty string if nothing is displayable
+        """
+        actual_len = self._len_printable(text)
+        if down > self._cached_height:
+            # Since all the text will not be displayable, skip
+            return ""
+        if right > self._cached_width:
+            return ""
+        if right + actual_len > self._cached_width:
+            # Truncate the string to prevent wraparound
+            # We take off the right side of the string to deal with formatting non-printables being on the left
+            offset = self._cached_width - right
+            trim = actual_len - offset
+            if trim < 1:
+                return ""
+            text = f"{text[:-trim]}"
+        if right < 0:
+            return ""
+        if down < 0:
+            return ""
+        move = self._move(down, right)
+        if "\x1b" in text:
+            # The text carries its own styling, return to the default style so the next cell can rely on it
+            return f"{move}{text}{self._default_style}"
+        # Plain text leaves the default style untouched, so re-sending it would be redundant
+        return f"{move}{text}"
+
+    def _draw(self, cells):
+        """
+        Writes several positioned strings to the terminal as a single frame, using one write and one flush
+        The frame is wrapped in a synchronized update, so supporting terminals never show it half drawn
+        :param cells: (iterable) Tuples of (text, right, down) as accepted by print()
+        """
+        if self._out_buffer is None:
+            # The stream has no binary layer to write to (it was likely replaced), so assemble text instead
+            with self._draw_lock:
+                self._console_signature = None
+                self._load_bar_key = None
+                buf = []
+                for text, right, down in cells:
+                    # Whatever the console pane last drew on this row is about to be overwritten
+                    self._last_rendered.pop(down, None)
+                    buf.append(self._compose(text, right, down))
+                frame = "".join(buf)
+                if frame:
+                    # Every frame starts from a known style, the terminal may have been styled by anything in between
+                    self._out.write(f"{self._sync_begin}{self._default_style}{frame}{self._sync_end}")
+                    self._out.flush()
+            return
+        # The frame buffer is shared between threads, so it is filled while holding the lock
+        with self._draw_lock:
+            self._console_signature = None
+            self._load_bar_key = None
+            framebuf = self._framebuf
+            framebuf.clear()
+            # Every frame starts from a known style, the terminal may have been styled by anything in between
+            framebuf.extend(self._frame_begin_bytes)
+            for text, right, down in cells:
+                # Whatever the console pane last drew on this row is about to be overwritten
+                self._last_rendered.pop(down, None)
+                framebuf.extend(self._compose(text, right, down).encode(self._out_encoding, self._out_errors))
+            if len(framebuf) > len(self._frame_begin_bytes):
+                framebuf.extend(self._sync_end_bytes)
+                # Text written to the stream is still buffered ahead of this frame, which must not overtake it
+                self._out.flush()
+                self._out_buffer.write(framebuf)
+                self._out_buffer.flush()
+
+    def _prerender(self, cells):
+        """
+        Composes a frame once, so a frame drawn over and over unchanged is not rebuilt for every draw
+        The frame is only valid until the terminal is resized, it is drawn with _draw_prerendered()
+        :param cells: (iterable) Tuples of (text, right, down) as accepted by print()
+        :return: (bytes) The frame, or (str) if the output stream has no binary layer to write to
+        """
+        body = "".join(self._compose(text, right, down) for text, right, down in cells)
+        frame = f"{self._sync_begin}{self._default_style}{body}{self._sync_end}"
+        if self._out_buffer is None:
+            return frame
+        return frame.encode(self._out_encoding, self._out_errors)
+
+    def _draw_prerendered(self, frame, rows):
+        """
+        Writes a frame built by _prerender() to the terminal, using one write and one flush
+        :param frame: The frame returned by _prerender()
+        :type frame: bytes
+        :param rows: (iterable) Rows the frame draws on
+        """
+        with self._draw_lock:
+            self._console_signature = None
+            self._load_bar_key = None
+            for row in rows:
+                # Whatever the console pane last drew on this row is about to be overwritten
+                self._last_rendered.pop(row, None)
+            if self._out_buffer is None:
+                self._out.write(frame)
+                self._out.flush()
+            else:
+                # Text written to the stream is still buffered ahead of this frame, which must not overtake it
+                self._out.flush()
+                self._out_buffer.write(frame)
+                self._out_buffer.flush()
+
+    def _print_frame(self, cells):
+        """
+        Behaves like print() for several positioned strings, but draws them as a single frame.
+        Unlike print(), the cursor is not saved and restored around the writes, the next draw positions it anyway.
+        :param cells: (iterable) Tuples of (text, right, down) as accepted by print()
+        """
+        # Check if output is going into a pipe or other unformatted output
+        if self._does_styling and self.rich_ui:
+            self._draw(cells)
+        else:
+            for text, right, down in cells:
+                self._out.write(f"{text}\n")
+                self._cursor_row += 1
+
+    def _fast_write_at(self, text, right, down):
+        """
+        Writes plain text at a specified X,Y coordinate, skipping the frame assembly of _draw()
+        Only meant for text without styling of its own, such as keystroke echoes
+        :param text: Text to be written on screen
+        :type text: str
+        :param right: X coordinate on screen
+        :type right: int
+        :param down: Y coordinate on screen
+        :type down: int
+        """
+        if not self._does_styling or not self.rich_ui:
+            self._print_frame(((text, right, down),))
+            return
+        if right < 0 or down < 0 or down > self._cached_height or right + len(text) > self._cached_width:
+            # Past the edge the text would wrap onto other rows, _draw() truncates or skips it instead
+            self._draw(((text, right, down),))
+            return
+        # Every frame leaves the default style active, so the text needs nothing but the cursor movement
+        data = f"{self._move(down, right)}{text}"
+        with self._draw_lock:
+            self._console_signature = None
+            self._load_bar_key = None
+            self._last_rendered.pop(down, None)
+            self._out.write(data)
+            self._out.flush()
 
     def _clear_console(self):
-        bar = " " * self._term.width
-        for row in range(1, self._term.height):
-            self.print(bar, 0, row, True)
+        if not self._does_styling or not self.rich_ui:
+            return
+        if not self._clear_eos:
+            # The terminal cannot erase to the end of the screen, so overwrite every row instead
+            self._draw((self._blank_row, 0, row) for row in range(1, self._cached_height))
+            return
+        # Everything below the title row is erased by the terminal itself
+        with self._draw_lock:
+            self._draw(((self._clear_eos, 0, 1),))
+            self._last_rendered.clear()
 
     def console(self, text, low_latency=False, ignore_log=False, **kwargs):
         """
         Write text to the virtual console similar to standard lib print()
+        May be called from several threads, appends and redraws of the consoles take turns on the render lock
         :param text: Text to be printed
         :type text: str
-        :param low_latency: Save text, but only print every 100 iterations to reduce latency
+        :param low_latency: Log the text at debug level only, for text arriving in floods
         :type low_latency: bool
         :param ignore_log: Do not log text
         :type ignore_log: bool
         :return:
         """
-        if not ignore_log and not low_latency:
-            self._logger.info(text)
-        elif not ignore_log and low_latency:
-            self._logger.debug(text)
-
-        console = kwargs.get("console", "a")
-        if console == "a":
-            self._contents_console_a.append(text)
-            while len(self._contents_console_a) >= self.console_scrollback:
-                self._contents_console_a.pop(0)
-        elif console == "b":
-            self._contents_console_b.append(text)
-            while len(self._contents_console_b) >= self.console_scrollback:
-                self._contents_console_b.pop(0)
-
-        if self._skip_iteration(low_latency):
-            return
-
+        if not ignore_log:
+            # Low latency calls tend to come in floods, so those are only logged at debug level
+            level = logging.DEBUG if low_latency else logging.INFO
+            if self._logger.isEnabledFor(level):
+                self._logger.log(level, text)
+
+        console = kwargs.get("console", _DEFAULT_CONSOLE)
+        entry = (text, self._len_printable(text))
+        # Redraws walk the consoles while holding the render lock, appending meanwhile would break that walk
+        with self._render_lock:
+            # Both consoles are bounded deques, so the oldest entries fall off on their own
+            if console == "a":
+                self._contents_console_a.append(entry)
+            elif console == "b":
+                self._contents_console_b.append(entry)
+            self._console_generation = next(self._console_counter)
+
+        # Redraws are held to max_fps in there, and the last one of a flood is deferred rather than dropped
         self._check_update()
 
     def notice(self, text, **kwargs):
-        self._logger.info(text)
-        if not self._logger.level <= logging.INFO:
+        if not self._logger.isEnabledFor(logging.INFO):
             return
+        self._logger.info(text)
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
+        if self._does_styling and self.rich_ui:
             self.console(
                 f"{self._get_time_string()}{self._default_style}{text}",
                 False,
@@ -435,17 +927,17 @@ class UIBlackTerminal:
                 **kwargs,
             )
         else:
-            print(f"{self._get_time_string()}{text}")
+            self._out.write(f"{self._get_time_string()}{text}\n")
 
     def info(self, *args, **kwargs):
         self.notice(*args, **kwargs)
 
     def debug(self, text, **kwargs):
-        self._logger.debug(text)
-        if not self._logger.level <= logging.DEBUG:
+        if not self._logger.isEnabledFor(logging.DEBUG):
             return
+        self._logger.debug(text)
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
+        if self._does_styling and self.rich_ui:
             self.console(
                 f"{self._get_time_string()}{self._default_style}{text}",
                 False,
@@ -453,14 +945,14 @@ class UIBlackTerminal:
                 **kwargs,
             )
         else:
-            print(f"{self._get_time_string()}{text}")
+            self._out.write(f"{self._get_time_string()}{text}\n")
 
     def error(self, text, **kwargs):
-        self._logger.error(text)
-        if not self._logger.level <= logging.ERROR:
+        if not self._logger.isEnabledFor(logging.ERROR):
             return
+        self._logger.error(text)
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
+        if self._does_styling and self.rich_ui:
             self.console(
                 f"{self._get_time_string()}{self._error_style}{text}",
                 False,
@@ -468,14 +960,14 @@ class UIBlackTerminal:
                 **kwargs,
             )
         else:
-            print(f"{self._get_time_string()}{text}")
+            self._out.write(f"{self._get_time_string()}{text}\n")
 
     def warn(self, text, **kwargs):
-        self._logger.warning(text)
-        if not self._logger.level <= logging.WARNING:
+        if not self._logger.isEnabledFor(logging.WARNING):
             return
+        self._logger.warning(text)
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
+        if self._does_styling and self.rich_ui:
             self.console(
                 f"{self._get_time_string()}{self._warn_style}{text}",
                 False,
@@ -483,14 +975,14 @@ class UIBlackTerminal:
                 **kwargs,
             )
         else:
-            print(f"{self._get_time_string()}{text}")
+            self._out.write(f"{self._get_time_string()}{text}\n")
 
     def print_center(self, text, style=None, corner=None, ignore_logging=False):
         self._check_update()
         if not ignore_logging:
             self._logger.info(text)
-        if not self._term.does_styling or not self.rich_ui:
-            print(text)
+        if not self._does_styling or not self.rich_ui:
+            self._out.write(f"{text}\n")
             return
         if style is None:
             style = self._window_style
@@ -499,235 +991,325 @@ class UIBlackTerminal:
 
         center_text = len(text) // 2
 
-        left_side = (self._term.width // 2) - (center_text + 4)
-        right_side = (self._term.width // 2) + (center_text + 2)
-        top_side = (self._term.height // 2) - 1
-        bottom_side = (self._term.height // 2) + 1
+        left_side = (self._cached_width // 2) - (center_text + 4)
+        right_side = (self._cached_width // 2) + (center_text + 2)
+        top_side = (self._cached_height // 2) - 1
+        bottom_side = (self._cached_height // 2) + 1
         total_len = right_side - left_side
 
         if corner != " ":
-            bar = " " * (total_len - 2)
-            bar = f"{style}{corner}{bar}{corner}"
+            bar = f"{style}{corner}{' ' * (total_len - 2)}{corner}"
         else:
-            bar = " " * total_len
-            bar = f"{style}{bar}"
+            bar = f"{style}{' ' * total_len}"
 
         padded_text = self._center_pad_text(text, total_len=total_len, pad=" ")
 
-        self.print(bar, left_side, top_side, True)
-        self.print(f"{style}{padded_text}", left_side, top_side + 1, True)
-        self.print(bar, left_side, bottom_side, True)
+        self._draw(
+            (
+                (bar, left_side, top_side),
+                (f"{style}{padded_text}", left_side, top_side + 1),
+                (bar, left_side, bottom_side),
+            )
+        )
 
     def error_center(self, text):
-        self._logger.error(text)
-        if self._logger.level >= logging.ERROR:
+        if not self._logger.isEnabledFor(logging.ERROR):
             return
+        self._logger.error(text)
         self.print_center(text, self._error_style, "!", True)
 
     def warn_center(self, text):
-        self._logger.warning(text)
-        if self._logger.level >= logging.WARNING:
+        if not self._logger.isEnabledFor(logging.WARNING):
             return
+        self._logger.warning(text)
         self.print_center(text, self._warn_style, "*", True)
 
     def bold(self, text):
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
-            return f"{self._term.bold}{text}"
+        if self._does_styling and self.rich_ui:
+            return f"{self._bold}{text}"
         else:
             return f"{text}"
 
     def window_text(self, text):
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
+        if self._does_styling and self.rich_ui:
             return f"{self._window_style}{text}"
         else:
             return f"{text}"
 
     def underline(self, text):
         # Check if output is going into a pipe or other unformatted output
-        if self._term.does_styling and self.rich_ui:
-            return f"{self._term.underline}{text}{self._term.no_underline}"
+        if self._does_styling and self.rich_ui:
+            return f"{self._underline}{text}{self._no_underline}"
         else:
             return f"{text}"
 
     def clear(self):
-        if self._term.does_styling and self.rich_ui:
-            print(self._term.clear())
+        if self._does_styling and self.rich_ui:
+            with self._draw_lock:
+                self._out.write(f"{self._clear}\n")
+                # Clearing homes the cursor, then the newline moves it to the second row
+                self._cursor_row = 1
+                self._last_rendered.clear()
+                self._console_signature = None
+                self._load_bar_key = None
             self._display_main_title()
 
     def quit(self):
         self._term.exit_fullscreen
+        self._shutdown_logging()
+
+    def _shutdown_logging(self):
+        """
+        Stops the background log writer once every queued record has been written, and flushes batched records
+        Any logging afterwards goes to the log sinks directly. Safe to call more than once
+        """
+        listener = self._log_listener
+        if listener is None:
+            return
+        self._log_listener = None
+        listener.stop()
+        # A later terminal with the same log name may have taken the logger over already
+        owns_logger = self._log_queue_handler in self._logger.handlers
+        self._logger.removeHandler(self._log_queue_handler)
+        for handler in listener.handlers:
+            # Batched records are written out now rather than whenever logging itself shuts down
+            handler.flush()
+            if owns_logger:
+                self._logger.addHandler(handler)
+
+    def _release_logging(self):
+        """
+        Writes out everything still queued or batched, then detaches and closes every log handler of this terminal
+        Used when a new terminal takes over the same log name, which reopens the same log file
+        """
+        self._shutdown_logging()
+        for handler in list(self._logger.handlers):
+            if getattr(handler, "_uiblack_terminal", None) is self:
+                self._logger.removeHandler(handler)
+        for handler in self._log_sinks:
+            target = handler.target
+            # Closing the batching handler flushes it, but leaves the file or socket it wrote to open
+            handler.close()
+            if target is not None:
+                target.close()
 
     def input(self, question=None, obfuscate=False, max_len=None):
         self._check_update()
-        self._lock.acquire()
-        input_height = self._term.height - 1
+        input_height = self._cached_height - 1
         input_offset = 2
 
-        if question is None:
-            question = "Press [Enter] to continue:"
-        else:
-            # Truncate questions to the length of the terminal window
-            question = question[0 : self._term.width - input_offset]
-        self._logger.debug(question)
-        self.print(f"{question}", input_offset, input_height - 1, True)
-
-        if max_len is None:
-            max_len = self._term.width - 3
-        result = ""
-        with self._term.cbreak():
-            while True:
-                val = ""
-                val = self._term.inkey()
-                found = self._pattern_text.match(val)
-                if val.name == "KEY_ENTER":
-                    break
-                elif val.is_sequence:
-                    print("got sequence: {0}.".format((str(val), val.name, val.code)))
-                elif val.name == "KEY_BACKSPACE" or val.name == "KEY_DELETE":
-                    self.print(" " * len(result), input_offset, input_height, True)
-                    result = result[:-1]
-                    if obfuscate:
-                        self.print("*" * len(result), input_offset, input_height, True)
-                    else:
-                        self.print(result, input_offset, input_height, True)
-                elif found is not None:
-                    if (len(result) + 1) <= max_len:
-                        result = f"{result}{val}"
-                    else:
-                        continue
-                    if obfuscate:
-                        self.print("*" * len(result), input_offset, input_height, True)
-                    else:
-                        self.print(result, input_offset, input_height, True)
-        self.print(f"{' ' * self._term.width}", 0, input_height - 1, True)
-        self.print(f"{' ' * self._term.width}", 0, input_height, True)
-        self._lock.release()
+        with self._prompt((input_height - 1, input_height)):
+            if question is None:
+                question = "Press [Enter] to continue:"
+            else:
+                # Truncate questions to the length of the terminal window
+                question = question[0 : self._cached_width - input_offset]
+            self._logger.debug(question)
+            # The console rows underneath are blanked first, they stay untouched until the prompt is answered
+            self._print_frame(
+                (
+                    (self._blank_row, 0, input_height - 1),
+                    (question, input_offset, input_height - 1),
+                    (self._blank_row, 0, input_height),
+                )
+            )
+
+            if max_len is None:
+                max_len = self._cached_width - 3
+            result = ""
+            with self._term.cbreak():
+                while True:
+                    val = self._term.inkey()
+                    # The name is looked up once, it is compared up to three times below
+                    name = val.name
+                    if name == "KEY_ENTER":
+                        break
+                    elif val.is_sequence:
+                        # Named keys are the rare case, so they are only told apart once a sequence was seen
+                        if name == "KEY_BACKSPACE" or name == "KEY_DELETE":
+                            if not result:
+                                continue
+                            result = result[:-1]
+                            # Only the erased character is blanked out, the rest of the line is already on screen
+                            self._fast_write_at(" ", input_offset + len(result), input_height)
+                        # Any other named key has no meaning here and is ignored
+                    elif val and val.isprintable():
+                        if (len(result) + 1) <= max_len:
+                            # The keystroke is turned into a plain string once, for both the result and the echo
+                            char = str(val)
+                            result = f"{result}{char}"
+                        else:
+                            continue
+                        if obfuscate:
+                            echo = "*"
+                        else:
+                            echo = char
+                        # Only the new character is drawn, right after the ones already on screen
+                        self._fast_write_at(echo, input_offset + len(result) - 1, input_height)
+            self._print_frame(((self._blank_row, 0, input_height - 1), (self._blank_row, 0, input_height)))
         return result
 
+    @contextmanager
+    def _prompt(self, rows):
+        """
+        Holds the screen for an interactive prompt, only one prompt at a time waits for keys
+        Other threads keep writing to the consoles meanwhile, their redraws just leave the rows of the prompt alone
+        :param rows: (iterable) Rows the prompt is drawn on
+        """
+        with self._input_lock:
+            # Taking the render lock waits out a console redraw in progress, which may still cover these rows
+            with self._render_lock:
+                # Anything still waiting on the frame budget is drawn before the prompt goes up
+                self._refresh_consoles(force=True)
+                self._reserved_rows = frozenset(rows)
+            try:
+                yield
+            finally:
+                with self._render_lock:
+                    self._reserved_rows = frozenset()
+
+    def _read_keys(self):
+        """
+        Waits for a keypress, then yields it along with any keys already queued behind it (held arrow keys repeat)
+        Callers redraw once after the batch rather than once per key, and keys after a break are left unread
+        :return: (generator) The keystrokes, in the order they were typed
+        """
+        val = self._term.inkey()
+        while val:
+            yield val
+            val = self._term.inkey(timeout=0)
+
     def _display_main_title(self):
-        if not self._term.does_styling or not self.rich_ui:
+        if not self._does_styling or not self.rich_ui:
             return
         if self._title is None:
             return
         center_text = len(self._title) // 2
-        center_screen = self._term.width // 2
+        center_screen = self._cached_width // 2
         final_location = center_screen - center_text
-        location_tuple = self._term.get_location()
-        if location_tuple[0] < 1:
-            print("")
-            # Moving the console cursor down by one to prevent overwriting title
-        self.print(self.window_text(f"{' ' * self._term.width}"), 0, 0, True)
-        self.print(self.window_text(self._title), final_location, 0, True)
+        # The cursor row is tracked locally, querying the terminal for it blocks until the terminal replies
+        if self._cursor_row < 1:
+            # Plain print() output starts below the title, rather than overwriting it
+            self._cursor_row = 1
+        self._draw(((self._blank_row_styled, 0, 0), (self.window_text(self._title), final_location, 0)))
 
     def set_main_title(self, new_title):
         if new_title is not None:
             # Truncate titles to the length of the terminal window
-            new_title = new_title[0 : self._term.width]
+            new_title = new_title[0 : self._cached_width]
         self._title = new_title
         self._logger.info(self._title)
         self._display_main_title()
 
     def ask_list(self, question, menu_list):
         self._check_update()
-        self._lock.acquire()
         self._logger.debug(question)
-        menu_height = self._term.height // 2
-        menu_offset = self._term.width // 2
+        menu_height = self._cached_height // 2
+        menu_offset = self._cached_width // 2
         menu_top = menu_height - (len(menu_list) + 1)
-        # Truncate questions to the length of the terminal window
-        question = question[0 : self._term.width - 2]
-        self.print(f"{question}", (menu_offset - len(question)), menu_top - 2)
-        index = 0
-        for menu_item in menu_list:
-            item_offset = menu_offset
-            self.print(f"{menu_item}", item_offset, (menu_top + index), True)
-            index += 2
-
-        index = 0
-        index_max = len(menu_list) - 1
-        with self._term.cbreak():
-            while True:
-                self.print(
-                    f"{self._term.reverse}{menu_list[index]}",
-                    menu_offset,
-                    (menu_top + (index * 2)),
-                    True,
-                )
-                val = self._term.inkey()
-                if val.name == "KEY_ENTER":
-                    break
-                elif val.name == "KEY_UP":
-                    self.print(
-                        f"{menu_list[index]}",
-                        menu_offset,
-                        (menu_top + (index * 2)),
-                        True,
-                    )
-                    index -= 1
-                    if index < 0:
-                        index = index_max
-                elif val.name == "KEY_DOWN":
-                    self.print(
-                        f"{menu_list[index]}",
-                        menu_offset,
-                        (menu_top + (index * 2)),
-                        True,
-                    )
-                    index += 1
-                    if index > index_max:
-                        index = 0
+        with self._prompt(range(menu_top - 2, menu_top + (len(menu_list) * 2))):
+            # Truncate questions to the length of the terminal window
+            question = question[0 : self._cached_width - 2]
+            self._logger.info(question)
+            frame = [(f"{question}", (menu_offset - len(question)), menu_top - 2)]
+            index = 0
+            for menu_item in menu_list:
+                item_offset = menu_offset
+                frame.append((f"{menu_item}", item_offset, (menu_top + index)))
+                index += 2
+            self._print_frame(frame)
+
+            index = 0
+            previous = None
+            with self._term.cbreak():
+                while True:
+                    # Un-highlighting the previous item and highlighting the current one is a single frame
+                    frame = []
+                    if previous is not None:
+                        frame.append((f"{menu_list[previous]}", menu_offset, (menu_top + (previous * 2))))
+                    frame.append((f"{self._reverse}{menu_list[index]}", menu_offset, (menu_top + (index * 2))))
+                    self._print_frame(frame)
+                    previous = index
+                    chosen = False
+                    for val in self._read_keys():
+                        name = val.name
+                        if name == "KEY_ENTER":
+                            chosen = True
+                            break
+                        step = _MENU_STEPS.get(name)
+                        if step is not None:
+                            # Moving past either end of the menu wraps around to the other
+                            index = (index + step) % len(menu_list)
+                    if chosen:
+                        break
 
-        self._lock.release()
         return menu_list[index]
 
-        return result
-
     def _gradient_red_green(self, percent):
-        if percent > 100 or percent < 0:
-            red = 0
-            green = 0
-            blue = 100
-        else:
-            red = 2 * (100 - percent)
-            green = 2 * percent
-            blue = 0
-        if self._term.does_styling and self.rich_ui:
-            return self._term.color_rgb(red, green, blue)
+        if self._does_styling and self.rich_ui:
+            if percent > 100 or percent < 0:
+                return self._gradient_out_of_range
+            return self._gradient_table[percent]
         else:
             return self._default_style
 
     def load_bar(self, title, iteration, total, low_latency=False, bar_length=50):
-        self._logger.debug(title)
-        if self._skip_iteration(low_latency):
-            return
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(title)
+        with self._load_bar_lock:
+            if self._skip_iteration(low_latency):
+                # Too soon to draw, but the latest call is drawn later on, so the final state always shows
+                self._deferred_load_bar = (title, iteration, total, bar_length)
+                if self._pending_load_bar is None:
+                    self._pending_load_bar = threading.Timer(self.low_latency_interval, self._deferred_load_bar_draw)
+                    self._pending_load_bar.daemon = True
+                    self._pending_load_bar.start()
+                return
+            # Anything still deferred is older than this call
+            self._deferred_load_bar = None
+            self._draw_load_bar(title, iteration, total, bar_length)
+
+    def _deferred_load_bar_draw(self):
+        with self._load_bar_lock:
+            self._pending_load_bar = None
+            deferred = self._deferred_load_bar
+            self._deferred_load_bar = None
+            if deferred is not None:
+                self._last_low_latency_update = time.monotonic()
+                self._draw_load_bar(*deferred)
+
+    def _draw_load_bar(self, title, iteration, total, bar_length):
         self._check_update()
-        if (bar_length + 6) > self._term.width:
-            bar_length = self._term.width - 6
-        bar_left_extent = (self._term.width // 2) - ((bar_length + 2) // 2)
-        bar_upward_extent = self._term.height // 2
-        title_left_extent = (self._term.width // 2) - ((len(title) + 2) // 2)
+        if (bar_length + 6) > self._cached_width:
+            # Too narrow a terminal leaves no room for the bar at all, rather than a negative length
+            bar_length = max(0, self._cached_width - 6)
+        bar_left_extent = (self._cached_width // 2) - ((bar_length + 2) // 2)
+        bar_upward_extent = self._cached_height // 2
+        title_left_extent = (self._cached_width // 2) - ((len(title) + 2) // 2)
         try:
             percent = int(round((iteration / total) * 100))
-            fill_len = int(round((bar_length * percent) / 100))
-            bar_fill = "█" * fill_len
-            bar_empty = " " * (bar_length - fill_len)
+            key = (title, percent, bar_length, self._cached_width, self._cached_height)
+            rich = self._does_styling and self.rich_ui
+            if rich and key == self._load_bar_key:
+                # The same bar is already on screen, plain output scrolls so only the rich UI keeps it in place
+                return
+            # Slicing the precomputed rows with a negative or oversized length would keep the wrong part of them
+            fill_len = max(0, min(int(round((bar_length * percent) / 100)), bar_length))
+            bar_fill = self._bar_fill_row[:fill_len]
+            bar_empty = self._blank_row[: bar_length - fill_len]
             progress_bar = f"{self._warn_style}[{self._gradient_red_green(percent)}{bar_fill + bar_empty}{self._warn_style}]{self._default_style}"
-            if self._term.does_styling and self.rich_ui:
-                padded_title = self._center_pad_text(title, total_len=bar_length)
-                self.print(f"{padded_title}", bar_left_extent, bar_upward_extent - 1, True)
-                for offset in range(0, 3):
-                    if offset == 1:
-                        suffix = f" {percent}%"
-                    else:
-                        suffix = ""
-                    self.print(
-                        f"{progress_bar}{suffix}",
-                        bar_left_extent,
-                        bar_upward_extent + offset,
-                        True,
+            if rich:
+                padded_title = title.center(bar_length)
+                # A single row carries the bar and the percentage, the rows above and below it were cosmetic copies
+                self._print_frame(
+                    (
+                        (padded_title, bar_left_extent, bar_upward_extent - 1),
+                        (f"{progress_bar} {percent}%", bar_left_extent, bar_upward_extent + 1),
                     )
+                )
+                self._load_bar_key = key
             else:
                 suffix = f" {percent}%"
                 self.print(
@@ -743,36 +1325,54 @@ class UIBlackTerminal:
     def ask_yn(self, question, default_response=False):
         self._logger.debug(question)
         self._check_update()
-        self._lock.acquire()
-        menu_height = self._term.height // 2
-        menu_offset = self._term.width // 2
+        menu_height = self._cached_height // 2
+        menu_offset = self._cached_width // 2
         no_offset = menu_offset + 8
         yes_offset = menu_offset - 8
         menu_top = menu_height - 1
-        # Truncate questions to the length of the terminal window
-        question = question[0 : self._term.width - 2]
-        self.print(f"{question}", (menu_offset - (len(question) // 2)), menu_top - 2, True)
-
-        self.print("YES", yes_offset, menu_height, True)
-        self.print("NO", no_offset, menu_height, True)
-
-        index = default_response
-        with self._term.cbreak():
-            while True:
-                if index:
-                    self.print(f"{self._term.reverse}YES", yes_offset, menu_height, True)
-                    self.print(f"{self._term.default}NO", no_offset, menu_height, True)
-                else:
-                    self.print(f"{self._term.default}YES", yes_offset, menu_height, True)
-                    self.print(f"{self._term.reverse}NO", no_offset, menu_height, True)
-                val = self._term.inkey()
-                if val.name == "KEY_ENTER":
-                    break
-                elif val.name == "KEY_RIGHT" or val == "n":
-                    index = False
-                elif val.name == "KEY_LEFT" or val == "y":
-                    index = True
-        self._lock.release()
+        with self._prompt(range(menu_top - 2, menu_height + 1)):
+            # Truncate questions to the length of the terminal window
+            question = question[0 : self._cached_width - 2]
+            self._print_frame(
+                (
+                    (f"{question}", (menu_offset - (len(question) // 2)), menu_top - 2),
+                    ("YES", yes_offset, menu_height),
+                    ("NO", no_offset, menu_height),
+                )
+            )
+
+            # The highlighted and plain forms of each choice never change while the question is open
+            yes_highlighted = f"{self._reverse}YES"
+            yes_plain = f"{self._default}YES"
+            no_highlighted = f"{self._reverse}NO"
+            no_plain = f"{self._default}NO"
+            choices = {
+                True: ((yes_highlighted, yes_offset, menu_height), (no_plain, no_offset, menu_height)),
+                False: ((yes_plain, yes_offset, menu_height), (no_highlighted, no_offset, menu_height)),
+            }
+            frames = None
+            if self._does_styling and self.rich_ui:
+                # Only the highlight moves while the question is open, so both possible frames are built up front
+                frames = {answer: self._prerender(cells) for answer, cells in choices.items()}
+            index = default_response
+            with self._term.cbreak():
+                while True:
+                    if frames is None:
+                        self._print_frame(choices[bool(index)])
+                    else:
+                        self._draw_prerendered(frames[bool(index)], (menu_height,))
+                    answered = False
+                    for val in self._read_keys():
+                        name = val.name
+                        if name == "KEY_ENTER":
+                            answered = True
+                            break
+                        # Plain characters have no name, they are looked up by the character itself
+                        choice = _CONFIRM_CHOICES.get(name or str(val))
+                        if choice is not None:
+                            index = choice
+                    if answered:
+                        break
         return index
 
     def wrapper(self, func: object) -> object:
@@ -790,21 +1390,29 @@ class UIBlackTerminal:
         :return: wrapped function call, safe from exceptions, but all of them logged
         """
 
+        @wraps(func)
         def function_wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                trace = traceback.format_exc(limit=-1).replace("\n", " >> ")
-                # Yes, I could have used self_logger.exception(), but this way ensures a single line output on the log
-                console = kwargs.get("console", "a")
-                self.error(f"Exception: {trace}", console=console)
-                self._check_update()
+                if self._logger.isEnabledFor(logging.ERROR):
+                    # Exception messages may span several lines, the log entry should not
+                    trace = _fast_trace(e).translate(_NEWLINE_TRANSLATION)
+                    # Yes, I could have used self_logger.exception(), but this way ensures a single line output on the log
+                    console = kwargs.get("console", _DEFAULT_CONSOLE)
+                    self.error(f"Exception: {trace}", console=console)
+                # Plain output was written out by error() already, only the rich UI has a screen to bring up to date
+                if self._does_styling and self.rich_ui:
+                    self._check_update()
 
         return function_wrapper
 
 
 if __name__ == "__main__":
-    ui = UIBlackTerminal("error")
-    ui.clear()
-    ui.error_center("UIBlack should not be run directly.")
-    exit(1)
+    # A whole terminal, log file and all, would be set up just to show one line, so it is written out directly
+    if os.isatty(2):
+        # Cleared and in bold red, as the full UI would have shown it
+        os.write(2, b"\x1b[2J\x1b[H\x1b[1;31mUIBlack should not be run directly.\x1b[0m\n")
+    else:
+        os.write(2, b"UIBlack should not be run directly.\n")
+    sys.exit(1)